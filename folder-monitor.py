@@ -3,41 +3,111 @@ import sys
 import json
 import time
 import argparse
+import importlib
 import subprocess
 import threading
 from pathlib import Path
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from watchdog.observers.polling import PollingObserver
+from watchdog.events import PatternMatchingEventHandler
 
-class PDFChangeHandler(FileSystemEventHandler):
+# Consecutive automatic retries after a failed or skipped run before waiting for new changes
+MAX_RETRIES = 5
+
+class PDFChangeHandler(PatternMatchingEventHandler):
     """
     Handler that detects changes in PDF files and implements debounce
     to execute the script only after a period without changes
+    Non-PDF paths and directories are filtered out by watchdog before dispatch
     """
     
-    def __init__(self, delay_seconds, script_path):
-        super().__init__()
+    def __init__(self, delay_seconds, script_path, max_delay_seconds=None, use_subprocess=False):
+        super().__init__(
+            patterns=['*.pdf'],
+            # Office lock files and macOS AppleDouble files aren't real PDFs
+            ignore_patterns=['*/~$*', '*\\~$*', '*/._*', '*\\._*'],
+            ignore_directories=True,
+            case_sensitive=False
+        )
         self.delay_seconds = delay_seconds
+        # Upper bound measured from the first event of a burst, so a continuous
+        # stream of events (e.g. Drive syncing many files) can't postpone the run forever
+        self.max_delay_seconds = max_delay_seconds if max_delay_seconds else delay_seconds * 10
         self.script_path = script_path
-        self.timer = None
+        self.use_subprocess = use_subprocess
         self.lock = threading.Lock()
         self.is_running = False
+        self.failed_runs = 0
+        self.first_event_ts = None
+        self.changed_paths = set()
+        # A single long-lived thread waits for the debounce deadline, so bursts
+        # of events only move a timestamp instead of spawning a Timer thread each
+        self.deadline = None
+        self.wakeup = threading.Event()
+        self.worker = threading.Thread(target=self.run_scheduler, daemon=True)
+        self.worker.start()
     
-    def is_pdf_file(self, file_path):
-        """Checks if the file is a PDF"""
-        return file_path.lower().endswith('.pdf')
-    
-    def reset_timer(self):
-        """Resets the debounce timer"""
+    def reset_timer(self, *paths):
+        """Resets the debounce timer, never past max_delay_seconds after the first event"""
         with self.lock:
-            # Cancel previous timer if it exists
-            if self.timer is not None:
-                self.timer.cancel()
+            self.changed_paths.update(paths)
+            
+            now = time.monotonic()
+            if self.first_event_ts is None:
+                self.first_event_ts = now
+            remaining = max(0, self.max_delay_seconds - (now - self.first_event_ts))
+            delay = min(self.delay_seconds, remaining)
             
-            # Create a new timer
-            self.timer = threading.Timer(self.delay_seconds, self.execute_script)
-            self.timer.start()
-            print(f"📁 Mudança detectada. Aguardando {self.delay_seconds}s sem novas mudanças...")
+            # Move the deadline and wake the scheduler so it recomputes its wait
+            self.deadline = now + delay
+            self.wakeup.set()
+            print(f"📁 Mudança detectada. Aguardando {delay:.0f}s sem novas mudanças...")
+    
+    def schedule_retry(self, changed_paths):
+        """
+        Schedules a new attempt after a failed or skipped run, doubling the wait each
+        time up to max_delay_seconds and giving up after MAX_RETRIES in a row
+        In-process runs keep the paths, so the incremental count doesn't miss them
+        (called with self.lock held)
+        """
+        self.failed_runs += 1
+        # A subprocess run always counts everything, so there are no paths to keep
+        if not self.use_subprocess:
+            self.changed_paths.update(changed_paths)
+        
+        if self.failed_runs > MAX_RETRIES:
+            print(f"🛑 {MAX_RETRIES} tentativas seguidas falharam. Aguardando novas mudanças para executar de novo.")
+            return
+        
+        delay = min(self.delay_seconds * 2 ** (self.failed_runs - 1), self.max_delay_seconds)
+        if self.deadline is None:
+            self.deadline = time.monotonic() + delay
+        self.wakeup.set()
+        print(f"🔁 Nova tentativa ({self.failed_runs}/{MAX_RETRIES}) em {delay:.0f}s")
+    
+    def run_scheduler(self):
+        """Waits for the debounce deadline and executes the script when it expires"""
+        while True:
+            # Clear before reading the deadline so a reset arriving meanwhile isn't lost
+            self.wakeup.clear()
+            with self.lock:
+                deadline = self.deadline
+            
+            if deadline is None:
+                self.wakeup.wait()
+                continue
+            
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                self.wakeup.wait(remaining)
+                continue
+            
+            with self.lock:
+                # Deadline moved while we were checking it; wait again
+                if self.deadline != deadline:
+                    continue
+                self.deadline = None
+            self.execute_script()
     
     def execute_script(self):
         """Executes the page counting script"""
@@ -47,54 +117,96 @@ class PDFChangeHandler(FileSystemEventHandler):
                 return
             
             self.is_running = True
-            self.timer = None
+            # Start a new burst; events arriving during the run are collected for the next one
+            changed_paths = self.changed_paths
+            self.changed_paths = set()
+            self.first_event_ts = None
         
+        succeeded = False
         try:
             print("\n" + "="*50)
             print("🚀 Executando contagem de páginas...")
+            print(f"📄 Arquivos PDF alterados: {len(changed_paths)}")
             print("="*50)
             
-            # Execute script using subprocess to maintain isolation
-            script_dir = os.path.dirname(os.path.abspath(self.script_path))
-            result = subprocess.run(
-                [sys.executable, self.script_path],
-                cwd=script_dir,
-                capture_output=False,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
+            returncode = run_page_counter(self.script_path, self.use_subprocess, changed_paths)
             
-            if result.returncode == 0:
+            if returncode == 0:
+                succeeded = True
                 print("\n✅ Script executado com sucesso!")
             else:
-                print(f"\n❌ Erro ao executar script (código: {result.returncode})")
+                print(f"\n❌ Erro ao executar script (código: {returncode})")
                 
         except Exception as e:
             print(f"\n❌ Erro ao executar script: {e}")
         finally:
             with self.lock:
                 self.is_running = False
+                if succeeded:
+                    self.failed_runs = 0
+                else:
+                    self.schedule_retry(changed_paths)
                 print("\n" + "="*50)
                 print("👀 Monitorando pasta... (Pressione Ctrl+C para parar)")
                 print("="*50 + "\n")
     
     def on_created(self, event):
-        """Called when a file is created"""
-        if not event.is_directory and self.is_pdf_file(event.src_path):
-            self.reset_timer()
+        """Called when a PDF file is created"""
+        self.reset_timer(event.src_path)
     
     def on_modified(self, event):
-        """Called when a file is modified"""
-        if not event.is_directory and self.is_pdf_file(event.src_path):
-            self.reset_timer()
+        """Called when a PDF file is modified"""
+        self.reset_timer(event.src_path)
+    
+    def on_deleted(self, event):
+        """Called when a PDF file is deleted"""
+        self.reset_timer(event.src_path)
     
     def on_moved(self, event):
-        """Called when a file is moved/renamed"""
-        if not event.is_directory:
-            # Check both source and destination files
-            if self.is_pdf_file(event.src_path) or (event.dest_path and self.is_pdf_file(event.dest_path)):
-                self.reset_timer()
+        """Called when a file is moved/renamed from or to a PDF name"""
+        self.reset_timer(event.src_path, event.dest_path)
+
+def load_page_counter(script_path):
+    """
+    Imports the page counting script as a module, keeping it loaded between runs
+    so its config, process pool and WhatsApp daemon stay warm
+    """
+    script_dir = os.path.dirname(os.path.abspath(script_path))
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    # The file name has a dash, so it can only be imported by name through importlib
+    return importlib.import_module(os.path.splitext(os.path.basename(script_path))[0])
+
+def run_page_counter(script_path, use_subprocess=False, changed_paths=None):
+    """
+    Runs the page counting script and returns an exit code
+    In-process by default; use_subprocess keeps the old isolated execution
+    changed_paths lets the in-process run count only the files that changed
+    """
+    if not use_subprocess:
+        try:
+            results = load_page_counter(script_path).run_once(changed_paths=changed_paths)
+        except Exception as e:
+            print(f"\n❌ Erro ao executar script em processo: {e}")
+            return 1
+        # None means another execution held the lock and nothing was counted
+        return 0 if results is not None else 1
+    
+    script_dir = os.path.dirname(os.path.abspath(script_path))
+    result = subprocess.run(
+        [sys.executable, script_path],
+        cwd=script_dir,
+        capture_output=False,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    )
+    return result.returncode
+
+def is_drive_path(path):
+    """Checks if the path looks like a Google Drive for desktop mount"""
+    normalized = path.replace('\\', '/').lower()
+    return any(marker in normalized for marker in ('/my drive/', '/meu drive/', 'google drive'))
 
 def load_config():
     """Loads settings from config.json"""
@@ -131,6 +243,11 @@ def main():
         type=str,
         help='Path of folder to monitor (overrides config.json)'
     )
+    parser.add_argument(
+        '--subprocess',
+        action='store_true',
+        help='Run the page counting script in a separate Python process on each change'
+    )
     
     args = parser.parse_args()
     
@@ -139,8 +256,15 @@ def main():
     
     # Use command line arguments or file settings
     delay_seconds = args.delay if args.delay else config.get('delay_seconds', 30)
+    max_delay_seconds = config.get('max_delay_seconds')
     watch_path = args.path if args.path else config.get('watch_path', 'G:/My Drive/XABLAU/')
     
+    # Google Drive mounts don't reliably emit native notifications, so poll them
+    use_polling = config.get('use_polling')
+    if use_polling is None:
+        use_polling = is_drive_path(watch_path)
+    poll_interval = config.get('poll_interval_seconds', 60)
+    
     # Check if monitoring is enabled
     if not config.get('enabled', True):
         print("⚠️ Monitoramento desabilitado no config.json")
@@ -168,29 +292,26 @@ def main():
     print("📊 Monitor de Pastas XABLAU")
     print("="*50)
     print(f"📁 Pasta monitorada: {watch_path}")
-    print(f"⏱️  Delay: {delay_seconds} segundos")
+    print(f"⏱️  Delay: {delay_seconds} segundos (máximo: {max_delay_seconds or delay_seconds * 10} segundos)")
     print(f"📄 Script: {script_path}")
+    print(f"⚙️  Execução: {'subprocesso' if args.subprocess else 'no mesmo processo'}")
+    if use_polling:
+        print(f"🔁 Modo: polling a cada {poll_interval} segundos")
+    else:
+        print("🔔 Modo: notificações nativas do sistema")
     print("="*50)
     
     # Initial state check when starting the monitor
     print("\n🔍 Verificando estado inicial da pasta...")
     print("="*50)
     try:
-        script_dir = os.path.dirname(os.path.abspath(script_path))
-        result = subprocess.run(
-            [sys.executable, script_path],
-            cwd=script_dir,
-            capture_output=False,
-            text=True,
-            encoding='utf-8',
-            errors='replace'
-        )
+        returncode = run_page_counter(script_path, args.subprocess)
         
-        if result.returncode == 0:
+        if returncode == 0:
             print("\n✅ Verificação inicial concluída!")
             print("ℹ️  Se não houver mudanças desde a última execução, nenhuma mensagem será enviada.")
         else:
-            print(f"\n⚠️  Verificação inicial concluída com avisos (código: {result.returncode})")
+            print(f"\n⚠️  Verificação inicial concluída com avisos (código: {returncode})")
     except Exception as e:
         print(f"\n❌ Erro na verificação inicial: {e}")
     
@@ -199,8 +320,8 @@ def main():
     print("="*50 + "\n")
     
     # Create handler and observer
-    event_handler = PDFChangeHandler(delay_seconds, script_path)
-    observer = Observer()
+    event_handler = PDFChangeHandler(delay_seconds, script_path, max_delay_seconds, args.subprocess)
+    observer = PollingObserver(timeout=poll_interval) if use_polling else Observer()
     observer.schedule(event_handler, watch_path, recursive=True)
     
     try:
@@ -1,14 +1,24 @@
 import os
+import sys
 import time
 import json
 import subprocess
 import argparse
+import atexit
+import functools
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from PyPDF2 import PdfReader
 import threading
+import queue
 import re
 import hashlib
+import itertools
+import mmap
+import zlib
+import sqlite3
 
 # Try to import fcntl (Unix only)
 try:
@@ -17,76 +27,817 @@ try:
 except ImportError:
     HAS_FCNTL = False
 
-def count_pdf_pages_fast(file_path):
+# Try to import msvcrt (Windows only)
+try:
+    import msvcrt
+    HAS_MSVCRT = True
+except ImportError:
+    HAS_MSVCRT = False
+
+# Try to import pypdfium2 (optional C++ backend, much faster than PyPDF2)
+try:
+    import pypdfium2 as pdfium
+    HAS_PDFIUM = True
+except ImportError:
+    HAS_PDFIUM = False
+
+# Try to import orjson (optional, faster JSON that encodes straight to bytes)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# PDF parsing is CPU bound, so it runs in one shared process pool (see get_process_pool)
+PROCESS_POOL_WORKERS = min(os.cpu_count() or 1, 8)
+PROCESS_POOL = None
+PROCESS_POOL_LOCK = threading.Lock()
+
+# Page cache connection of a pool worker, used to find copies of cached files
+# (see count_pdf_pages_batch); stays None in the main process
+WORKER_PAGE_CACHE = None
+
+# Long-lived whatsapp-sender.js process (see send_via_whatsapp_daemon)
+WHATSAPP_DAEMON = None
+WHATSAPP_DAEMON_LINES = None
+WHATSAPP_DAEMON_LOGGER = None
+WHATSAPP_DAEMON_LOCK = threading.Lock()
+
+# Directory holding config.json, the state files and whatsapp-sender.js
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Parsed config.json with the (mtime_ns, size) it was read at (see load_config)
+CONFIG_CACHE = None
+
+# pagecounter.log handle kept open for the whole process (see get_log_file)
+LOG_FILE = None
+LOG_FILE_LOCK = threading.Lock()
+
+# Anything smaller can't hold a PDF header, page tree and trailer, e.g. the
+# empty placeholders Google Drive creates while a file is still syncing
+MIN_PDF_SIZE = 128
+
+# Office lock files and macOS AppleDouble files share the .pdf suffix but aren't PDFs
+IGNORED_PDF_PREFIXES = ('~$', '._')
+
+# Patterns used to read the page count straight from the xref/trailer
+STARTXREF_RE = re.compile(rb'startxref\s+(\d+)')
+OBJ_HEADER_RE = re.compile(rb'\s*(\d+)\s+(\d+)\s+obj')
+XREF_SUBSECTION_RE = re.compile(rb'\s*(\d+)[ \t]+(\d+)[ \t]*(?:\r\n|\r|\n)')
+XREF_ENTRY_RE = re.compile(rb'(\d{10})[ ](\d{5})[ ]([nf])')
+ROOT_REF_RE = re.compile(rb'/Root\s+(\d+)\s+\d+\s+R')
+PAGES_REF_RE = re.compile(rb'/Pages\s+(\d+)\s+\d+\s+R')
+COUNT_RE = re.compile(rb'/Count\s+(\d+)')
+PREV_RE = re.compile(rb'/Prev\s+(\d+)')
+XREFSTM_RE = re.compile(rb'/XRefStm\s+(\d+)')
+W_RE = re.compile(rb'/W\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s*\]')
+INDEX_RE = re.compile(rb'/Index\s*\[([\d\s]*)\]')
+SIZE_RE = re.compile(rb'/Size\s+(\d+)')
+PREDICTOR_RE = re.compile(rb'/Predictor\s+(\d+)')
+FILTER_RE = re.compile(rb'/Filter\s*(\[[^\]]*\]|/\w+)')
+FIRST_RE = re.compile(rb'/First\s+(\d+)')
+N_RE = re.compile(rb'/N\s+(\d+)')
+PAGE_TYPE_RE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+
+# Leading "1." / "12 " numbering of employee folders
+EMPLOYEE_PREFIX_RE = re.compile(r'^\d+\.?\s*')
+# Root folders whose subfolders are counted separately, matched anywhere in the name
+VICTORIA_RE = re.compile(r'VICTORIA', re.IGNORECASE)
+# Timestamp lines left out of the message hash
+TIMESTAMP_LINE_RE = re.compile(r'^.*(?:🕒|Data/Hora).*(?:\n|$)', re.MULTILINE)
+
+def read_stream_data(mm, dict_end):
+    """
+    Returns the decoded data of the stream starting right after dict_end
+    Only unfiltered and FlateDecode streams are supported
+    """
+    start = mm.find(b'stream', dict_end)
+    if start < 0:
+        raise ValueError("stream keyword not found")
+    header = mm[dict_end:start]
+    start += len(b'stream')
+    if mm[start:start + 2] == b'\r\n':
+        start += 2
+    elif mm[start:start + 1] in (b'\r', b'\n'):
+        start += 1
+    end = mm.find(b'endstream', start)
+    if end < 0:
+        raise ValueError("endstream keyword not found")
+    raw = mm[start:end]
+    stream_filter = FILTER_RE.search(header)
+    if not stream_filter:
+        return raw
+    if re.findall(rb'/(\w+)', stream_filter.group(1)) != [b'FlateDecode']:
+        raise ValueError("unsupported stream filter")
+    # decompressobj ignores the trailing EOL before endstream
+    return zlib.decompressobj().decompress(raw)
+
+def read_xref_stream_row(data, columns, predictor, row):
+    """
+    Returns one decoded row of an xref stream, undoing the PNG predictor if present
+    """
+    if predictor < 10:
+        return data[row * columns:(row + 1) * columns]
+    width = columns + 1
+    previous = bytearray(columns)
+    for r in range(row + 1):
+        chunk = data[r * width:(r + 1) * width]
+        if len(chunk) != width:
+            raise ValueError("truncated xref stream")
+        current = bytearray(chunk[1:])
+        if chunk[0] == 1:
+            for i in range(1, columns):
+                current[i] = (current[i] + current[i - 1]) & 0xFF
+        elif chunk[0] == 2:
+            for i in range(columns):
+                current[i] = (current[i] + previous[i]) & 0xFF
+        elif chunk[0] != 0:
+            raise ValueError("unsupported PNG predictor")
+        previous = current
+    return bytes(previous)
+
+def read_xref_section(mm, offset, objnum):
+    """
+    Reads the xref section at offset and looks up objnum in it
+    Returns (entry, trailer) where entry is (1, offset), (2, stream_objnum, index) or None
+    and trailer holds the raw trailer dictionary bytes
+    """
+    if mm[offset:offset + 4] == b'xref':
+        pos = offset + 4
+        entry = None
+        while True:
+            match = XREF_SUBSECTION_RE.match(mm, pos)
+            if not match:
+                break
+            first, count = int(match.group(1)), int(match.group(2))
+            pos = match.end()
+            if entry is None and first <= objnum < first + count:
+                # Classic xref entries are always exactly 20 bytes long
+                entry_match = XREF_ENTRY_RE.match(mm, pos + (objnum - first) * 20)
+                if not entry_match:
+                    raise ValueError("malformed xref entry")
+                if entry_match.group(3) == b'n':
+                    entry = (1, int(entry_match.group(1)))
+            pos += count * 20
+        trailer_start = mm.find(b'trailer', pos)
+        trailer_end = mm.find(b'startxref', trailer_start)
+        if trailer_start < 0 or trailer_end < 0:
+            raise ValueError("trailer not found")
+        return entry, mm[trailer_start:trailer_end]
+
+    match = OBJ_HEADER_RE.match(mm, offset)
+    if not match:
+        raise ValueError("xref offset does not point to an xref section")
+    dict_end = mm.find(b'stream', match.end())
+    trailer = mm[match.end():dict_end]
+    widths = W_RE.search(trailer)
+    if dict_end < 0 or b'/XRef' not in trailer or not widths:
+        raise ValueError("invalid xref stream")
+    widths = [int(w) for w in widths.groups()]
+    index = INDEX_RE.search(trailer)
+    if index:
+        ranges = [int(n) for n in index.group(1).split()]
+    else:
+        ranges = [0, int(SIZE_RE.search(trailer).group(1))]
+
+    row = 0
+    for first, count in zip(ranges[0::2], ranges[1::2]):
+        if first <= objnum < first + count:
+            row += objnum - first
+            break
+        row += count
+    else:
+        return None, trailer
+
+    predictor = PREDICTOR_RE.search(trailer)
+    data = read_stream_data(mm, match.end())
+    fields = read_xref_stream_row(
+        data, sum(widths),
+        int(predictor.group(1)) if predictor else 1,
+        row
+    )
+    values = []
+    pos = 0
+    for width in widths:
+        values.append(int.from_bytes(fields[pos:pos + width], 'big'))
+        pos += width
+    entry_type = values[0] if widths[0] else 1
+    if entry_type == 1:
+        return (1, values[1]), trailer
+    if entry_type == 2:
+        return (2, values[1], values[2]), trailer
+    return None, trailer
+
+def find_xref_entry(mm, xref_offset, objnum):
+    """
+    Follows the xref chain (newest section first) until objnum is found
+    """
+    seen = set()
+    offset = xref_offset
+    while offset is not None and offset not in seen:
+        seen.add(offset)
+        entry, trailer = read_xref_section(mm, offset, objnum)
+        if entry is not None:
+            return entry
+        # Hybrid-reference files keep compressed objects in a separate stream
+        xrefstm = XREFSTM_RE.search(trailer)
+        if xrefstm and int(xrefstm.group(1)) not in seen:
+            entry, _ = read_xref_section(mm, int(xrefstm.group(1)), objnum)
+            if entry is not None:
+                return entry
+        prev = PREV_RE.search(trailer)
+        offset = int(prev.group(1)) if prev else None
+    return None
+
+def read_pdf_object(mm, xref_offset, objnum):
+    """
+    Returns the raw bytes of an object, resolving it inside an object stream if needed
+    """
+    entry = find_xref_entry(mm, xref_offset, objnum)
+    if entry is None:
+        raise ValueError(f"object {objnum} not found in xref")
+
+    if entry[0] == 1:
+        match = OBJ_HEADER_RE.match(mm, entry[1])
+        if not match or int(match.group(1)) != objnum:
+            raise ValueError(f"bad offset for object {objnum}")
+        end = mm.find(b'endobj', match.end())
+        return mm[match.end():end if end >= 0 else len(mm)]
+
+    _, stream_objnum, index = entry
+    stream_entry = find_xref_entry(mm, xref_offset, stream_objnum)
+    if stream_entry is None or stream_entry[0] != 1:
+        raise ValueError(f"object stream {stream_objnum} not found")
+    match = OBJ_HEADER_RE.match(mm, stream_entry[1])
+    if not match:
+        raise ValueError(f"bad offset for object stream {stream_objnum}")
+    header = mm[match.end():mm.find(b'stream', match.end())]
+    first = int(FIRST_RE.search(header).group(1))
+    count = int(N_RE.search(header).group(1))
+    data = read_stream_data(mm, match.end())
+    numbers = [int(n) for n in data[:first].split()[:count * 2]]
+    offsets = numbers[1::2]
+    if index >= len(offsets) or numbers[index * 2] != objnum:
+        raise ValueError(f"object {objnum} not found in object stream")
+    end = first + offsets[index + 1] if index + 1 < len(offsets) else len(data)
+    return data[first + offsets[index]:end]
+
+def count_pdf_pages_from_xref(file_path):
+    """
+    Reads /Count from the root page tree by following startxref -> trailer /Root
+    -> catalog /Pages, without building the document object graph
+    Returns None when the count cannot be read this way
+    """
+    with open(file_path, "rb") as pdf_file:
+        with mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            tail_start = max(0, len(mm) - 4096)
+            startxref = mm.rfind(b'startxref', tail_start)
+            if startxref < 0:
+                return None
+            match = STARTXREF_RE.match(mm, startxref)
+            if not match:
+                return None
+            xref_offset = int(match.group(1))
+
+            _, trailer = read_xref_section(mm, xref_offset, -1)
+            root = ROOT_REF_RE.search(trailer)
+            if not root:
+                return None
+            catalog = read_pdf_object(mm, xref_offset, int(root.group(1)))
+            pages_ref = PAGES_REF_RE.search(catalog)
+            if not pages_ref:
+                return None
+            pages = read_pdf_object(mm, xref_offset, int(pages_ref.group(1)))
+            count = COUNT_RE.search(pages)
+            return int(count.group(1)) if count else None
+
+def count_pdf_pages_by_scan(file_path):
+    """
+    Approximates the page count by counting /Type /Page dictionaries in the raw bytes
+    Returns None when the count can't be trusted: page objects hidden inside
+    object streams, or several revisions appended by incremental updates
+    """
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b'/ObjStm') >= 0 or mm.find(b'%%EOF') != mm.rfind(b'%%EOF'):
+                return None
+            pages = sum(1 for _ in PAGE_TYPE_RE.finditer(mm))
+    return pages or None
+
+def count_pdf_pages_or_error(file_path, approximate=False):
     """
     Counts pages of a single PDF file in an optimized way
+    Tries the xref/trailer /Count lookup first, then the raw /Type /Page scan
+    (only if approximate is set), then pypdfium2 (if installed), and only falls
+    back to a full PyPDF2 parse when all of them fail
+    Returns (pages, error), with pages 0 and the error message if all failed
     """
+    try:
+        pages = count_pdf_pages_from_xref(file_path)
+        if pages is not None:
+            return pages, None
+    except Exception:
+        pass
+
+    if approximate:
+        try:
+            pages = count_pdf_pages_by_scan(file_path)
+            if pages is not None:
+                return pages, None
+        except Exception:
+            pass
+
+    if HAS_PDFIUM:
+        try:
+            pdf = pdfium.PdfDocument(file_path)
+            try:
+                return len(pdf), None
+            finally:
+                pdf.close()
+        except Exception:
+            pass
+
     try:
         with open(file_path, "rb") as pdf_file:
-            pdf_reader = PdfReader(pdf_file)
-            return len(pdf_reader.pages)
+            pdf_reader = PdfReader(pdf_file, strict=False)
+            # Read /Count from the page tree root instead of flattening every page
+            try:
+                pages = int(pdf_reader.trailer["/Root"].get_object()["/Pages"].get_object()["/Count"])
+                if pages > 0:
+                    return pages, None
+            except Exception:
+                pass
+            return len(pdf_reader.pages), None
     except Exception as e:
-        print(f"Error processing {file_path}: {e}")
-        return 0
+        return 0, str(e)
 
-def get_pdf_files(directory):
+def is_pdf_name(name):
     """
-    Collects all PDF files from a directory efficiently
+    Checks if a file name is a countable PDF
+    Partial downloads (.crdownload, .part, .tmp) and placeholder files never match
+    """
+    # Only lowercase the 3-char suffix instead of the whole name
+    return (len(name) >= 4 and name[-4] == '.' and name[-3:].lower() == 'pdf'
+            and not name.startswith(IGNORED_PDF_PREFIXES))
+
+def scan_directory(directory):
+    """
+    Lists a single directory with os.scandir
+    Returns (pdf_files, subdirectories) using the entry types cached by scandir
+    pdf_files holds (path, stat_result) pairs, stat_result being None if it failed
     """
     pdf_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(os.path.join(root, file))
-    return pdf_files
+    subdirectories = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                    continue
+                # Symlinked directories aren't entered, but symlinked PDFs are still
+                # counted, as os.walk did and as the incremental os.path.isfile check does
+                if is_pdf_name(entry.name) and entry.is_file():
+                    # Stat here, in the listing threads, instead of serially while
+                    # counting; on Windows scandir already has it for free
+                    try:
+                        stat_result = entry.stat()
+                    except OSError:
+                        stat_result = None
+                    pdf_files.append((entry.path, stat_result))
+    except OSError as e:
+        print(f"Error listing {directory}: {e}")
+    return pdf_files, subdirectories
+
+def iter_pdf_files_by_label(targets, max_workers=16):
+    """
+    Walks several (label, directory) targets at once and yields
+    (label, file_path, stat_result) tasks as each directory listing completes
+    Subdirectories of every target share the same thread pool, since on Google
+    Drive each listing is dominated by round-trip latency rather than CPU
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(scan_directory, directory): label for label, directory in targets}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                label = pending.pop(future)
+                files, subdirectories = future.result()
+                for sub in subdirectories:
+                    pending[executor.submit(scan_directory, sub)] = label
+                for file_path, stat_result in files:
+                    yield label, file_path, stat_result
+
+def open_page_cache():
+    """
+    Opens the per-file page count cache, creating it if needed
+    Returns None if the cache cannot be used
+    """
+    try:
+        conn = sqlite3.connect(get_page_cache_file_path(), timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, pages INTEGER, content_key TEXT)"
+        )
+        # Caches created before content_key existed
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+        if 'content_key' not in columns:
+            conn.execute("ALTER TABLE pages ADD COLUMN content_key TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS pages_content_key ON pages (content_key)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        return conn
+    except sqlite3.Error as e:
+        print(f"Warning: Could not open page cache: {e}")
+        return None
+
+def cached_count(conn, file_path, stat_result):
+    """
+    Returns the cached page count for file_path if its mtime and size still match
+    Returns None on a cache miss
+    """
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(
+            "SELECT pages FROM pages WHERE path = ? AND mtime_ns = ? AND size = ?",
+            (file_path, stat_result.st_mtime_ns, stat_result.st_size)
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+def get_content_key(file_path, size):
+    """
+    Returns a fingerprint of the file made of its size and a BLAKE2 hash of
+    its first and last 4 KiB (the whole file if it is smaller than 8 KiB),
+    so copies of the same PDF share a cache entry
+    Returns None if the file cannot be read
+    """
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(4096)
+            # Never skip the bytes between head and tail on files under 8 KiB
+            f.seek(max(4096, size - 4096))
+            tail = f.read()
+    except OSError:
+        return None
+    return f"{size}:{hashlib.blake2b(head + tail, digest_size=16).hexdigest()}"
+
+def cached_count_by_content(conn, content_key):
+    """
+    Returns the page count of any cached file with the same content fingerprint
+    Returns None on a cache miss
+    """
+    if conn is None or content_key is None:
+        return None
+    try:
+        row = conn.execute(
+            "SELECT pages FROM pages WHERE content_key = ? LIMIT 1", (content_key,)
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+def store_cached_counts(conn, rows):
+    """
+    Saves (path, mtime_ns, size, pages, content_key) rows to the cache in a single transaction
+    """
+    if conn is None or not rows:
+        return
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pages (path, mtime_ns, size, pages, content_key) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+    except sqlite3.Error as e:
+        print(f"Warning: Could not update page cache: {e}")
+
+def delete_cached_counts(conn, paths):
+    """
+    Removes cache rows for files that no longer exist or could not be counted
+    """
+    if conn is None or not paths:
+        return
+    try:
+        with conn:
+            conn.executemany("DELETE FROM pages WHERE path = ?", ((path,) for path in paths))
+    except sqlite3.Error as e:
+        print(f"Warning: Could not update page cache: {e}")
+
+def get_path_range(directory):
+    """
+    Returns the (low, high) bounds matching every path inside directory,
+    so a prefix lookup can use the primary key index instead of LIKE
+    """
+    prefix = os.path.join(os.path.abspath(directory), '')
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def sum_cached_pages(conn, directory):
+    """
+    Returns the total pages cached for all files inside directory
+    """
+    low, high = get_path_range(directory)
+    row = conn.execute(
+        "SELECT COALESCE(SUM(pages), 0) FROM pages WHERE path >= ? AND path < ?", (low, high)
+    ).fetchone()
+    return row[0]
+
+def prune_cached_counts(conn, root_directory, seen_paths):
+    """
+    Removes cache rows under root_directory for files not found by a full scan
+    """
+    if conn is None:
+        return
+    low, high = get_path_range(root_directory)
+    try:
+        stale = [
+            path for (path,) in conn.execute(
+                "SELECT path FROM pages WHERE path >= ? AND path < ?", (low, high)
+            )
+            if path not in seen_paths
+        ]
+    except sqlite3.Error as e:
+        print(f"Warning: Could not read page cache: {e}")
+        return
+    delete_cached_counts(conn, stale)
+
+def mark_full_scan(conn, root_directory):
+    """
+    Records that the cache now mirrors every PDF under root_directory
+    """
+    if conn is None:
+        return
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [('full_scan_root', os.path.abspath(root_directory)),
+                 ('full_scan_time', str(time.time()))]
+            )
+    except sqlite3.Error as e:
+        print(f"Warning: Could not update page cache: {e}")
 
-def count_pages_in_directory_parallel(directory, max_workers=4):
+def can_count_incrementally(conn, root_directory, max_age_seconds):
     """
-    Counts pages using parallel processing
+    Checks if a recent full scan of root_directory is recorded in the cache,
+    so folder totals can be rebuilt from it after updating only changed files
+    """
+    if conn is None:
+        return False
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+    except sqlite3.Error:
+        return False
+    if meta.get('full_scan_root') != os.path.abspath(root_directory):
+        return False
+    try:
+        return time.time() - float(meta.get('full_scan_time')) < max_age_seconds
+    except (TypeError, ValueError):
+        return False
+
+def get_process_pool():
+    """
+    Returns the module-level process pool used to parse PDFs, creating it on first use
+    """
+    global PROCESS_POOL
+    with PROCESS_POOL_LOCK:
+        if PROCESS_POOL is None:
+            PROCESS_POOL = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS)
+            atexit.register(PROCESS_POOL.shutdown)
+        return PROCESS_POOL
+
+def discard_process_pool(pool):
     """
-    pdf_files = get_pdf_files(directory)
+    Shuts down a broken process pool so get_process_pool creates a new one
+    """
+    global PROCESS_POOL
+    with PROCESS_POOL_LOCK:
+        if PROCESS_POOL is pool:
+            PROCESS_POOL = None
+    pool.shutdown(wait=False)
+
+def get_worker_page_cache():
+    """
+    Returns the page cache connection of the current pool worker, opening it on first use
+    """
+    global WORKER_PAGE_CACHE
+    if WORKER_PAGE_CACHE is None:
+        WORKER_PAGE_CACHE = open_page_cache()
+    return WORKER_PAGE_CACHE
+
+def count_pdf_pages_batch(files, approximate=False):
+    """
+    Counts pages of several (file_path, size) files in one worker call to amortize the IPC cost
+    Each file is fingerprinted here, off the main thread, and copies of a file
+    already in the page cache are not parsed again
+    Returns (pages, error, content_key) triples; workers don't print, so errors
+    are reported together by the caller instead of contending for the console
+    """
+    conn = get_worker_page_cache()
+    results = []
+    for file_path, size in files:
+        content_key = get_content_key(file_path, size)
+        pages = cached_count_by_content(conn, content_key)
+        if pages is not None:
+            results.append((pages, None, content_key))
+        else:
+            results.append(count_pdf_pages_or_error(file_path, approximate) + (content_key,))
+    return results
+
+def iter_pdf_pages(files, max_workers=PROCESS_POOL_WORKERS, batch_size=8, approximate=False):
+    """
+    Parses (file_path, size) files in the process pool and yields
+    (file_path, pages, error, content_key) as batches complete
+    At most 2 * max_workers batches are in flight, so memory stays constant
+    no matter how many files are consumed from the iterable
+    """
+    remaining = iter(files)
+    # future -> (batch, pool, retried)
+    in_flight = {}
     
-    if not pdf_files:
-        return 0
+    def submit(batch, retried=False):
+        pool = get_process_pool()
+        try:
+            future = pool.submit(count_pdf_pages_batch, batch, approximate)
+        except BrokenProcessPool:
+            # The pool broke since it was last used, e.g. in a previous monitor run
+            discard_process_pool(pool)
+            pool = get_process_pool()
+            future = pool.submit(count_pdf_pages_batch, batch, approximate)
+        in_flight[future] = (batch, pool, retried)
     
-    total_pages = 0
+    def submit_next():
+        batch = list(itertools.islice(remaining, batch_size))
+        if batch:
+            submit(batch)
+        return bool(batch)
     
-    # Use ThreadPoolExecutor for parallel processing
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_file = {executor.submit(count_pdf_pages_fast, file_path): file_path 
-                         for file_path in pdf_files}
-        
-        # Collect results as they are completed
-        for future in as_completed(future_to_file):
-            file_path = future_to_file[future]
+    for _ in range(2 * max_workers):
+        if not submit_next():
+            break
+    
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            batch, pool, retried = in_flight.pop(future)
+            submit_next()
             try:
-                pages = future.result()
-                total_pages += pages
+                results = future.result()
+            except BrokenProcessPool as e:
+                # A killed worker (out of memory, antivirus...) breaks the whole pool:
+                # replace it and retry the batch once
+                discard_process_pool(pool)
+                if not retried:
+                    submit(batch, retried=True)
+                    continue
+                results = [(0, str(e), None)] * len(batch)
             except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+                results = [(0, str(e), None)] * len(batch)
+            for (file_path, _), (pages, error, content_key) in zip(batch, results):
+                yield file_path, pages, error, content_key
+
+def count_pages_by_label(tasks, seen_paths=None, approximate=False):
+    """
+    Counts pages for (label, file_path) tasks in a single pass over the process
+    pool, so large and small folders share the same work queue
+    A task may carry a third stat_result item to avoid another stat call
+    tasks may be a lazy iterable: files are sent to the pool as they are produced,
+    so listing folders and parsing PDFs overlap
+    Files whose mtime and size match the page cache are not parsed again, and
+    neither are copies of a file already cached (same content fingerprint)
+    If seen_paths is a set, the absolute path of every task is added to it
+    approximate enables the raw /Type /Page scan tier (pdf.approximate_page_scan)
+    Returns a dict with the total pages per label
+    """
+    totals = defaultdict(int)
+    conn = open_page_cache()
     
-    return total_pages
+    new_rows = []
+    # Rows of files that now count as 0 pages, so the cache keeps mirroring the totals
+    stale_paths = []
+    # Files sent to the pool (file_path -> (label, stat_result))
+    pending = {}
+    # (file_path, error) pairs, reported once at the end
+    errors = []
+    
+    def iter_misses():
+        """
+        Resolves cache hits as tasks arrive and yields only the files to parse
+        """
+        for task in tasks:
+            label = task[0]
+            file_path = os.path.abspath(task[1])
+            stat_result = task[2] if len(task) > 2 else None
+            if seen_paths is not None:
+                seen_paths.add(file_path)
+            if stat_result is None:
+                try:
+                    stat_result = os.stat(file_path)
+                except OSError as e:
+                    errors.append((file_path, e))
+                    stale_paths.append(file_path)
+                    continue
+            if stat_result.st_size < MIN_PDF_SIZE:
+                stale_paths.append(file_path)
+                continue
+            pages = cached_count(conn, file_path, stat_result)
+            if pages is not None:
+                totals[label] += pages
+                continue
+            # The content fingerprint is read in the worker, not here
+            pending[file_path] = (label, stat_result)
+            yield file_path, stat_result.st_size
+    
+    try:
+        # Parse the misses in worker processes, saving results to the cache as they
+        # arrive so an interrupted run keeps its progress
+        results = iter_pdf_pages(iter_misses(), approximate=approximate)
+        for done, (file_path, pages, error, content_key) in enumerate(results, 1):
+            label, stat_result = pending.pop(file_path)
+            if error:
+                errors.append((file_path, error))
+            totals[label] += pages
+            # 0 means the file could not be read, so retry it next run
+            if pages > 0:
+                new_rows.append((file_path, stat_result.st_mtime_ns, stat_result.st_size, pages, content_key))
+            else:
+                stale_paths.append(file_path)
+            if len(new_rows) >= 256:
+                store_cached_counts(conn, new_rows)
+                del new_rows[:]
+            if done % 500 == 0:
+                print(f"⏳ {done} PDFs processados...")
+        
+        store_cached_counts(conn, new_rows)
+        delete_cached_counts(conn, stale_paths)
+    finally:
+        if conn is not None:
+            conn.close()
+    
+    if errors:
+        print("\n".join(
+            [f"⚠️ {len(errors)} PDF(s) não puderam ser lidos (contados como 0 páginas):"]
+            + [f"Error processing {file_path}: {error}" for file_path, error in errors]
+        ))
+    
+    return totals
+
+def count_pages_incrementally(root_directory, changed_paths, targets, max_age_seconds, approximate=False):
+    """
+    Counts again only the changed files under root_directory and rebuilds the
+    folder totals from the page cache
+    Returns a dict with the total pages per label, or None if the cache doesn't
+    hold a recent full scan of root_directory and a full scan is needed
+    """
+    conn = open_page_cache()
+    if conn is None:
+        return None
+    try:
+        if not can_count_incrementally(conn, root_directory, max_age_seconds):
+            return None
+        
+        root_directory = os.path.abspath(root_directory)
+        root_prefix = os.path.normcase(os.path.join(root_directory, ''))
+        changed_files = set()
+        for path in changed_paths:
+            path = os.path.abspath(path)
+            # Rebase onto the configured root so paths reported with a different
+            # case by the watcher map to the same cache rows as a full scan
+            if os.path.normcase(path).startswith(root_prefix):
+                changed_files.add(os.path.join(root_directory, path[len(root_prefix):]))
+        log_message(f"⚡ Contagem incremental: {len(changed_files)} arquivo(s) alterado(s)")
+        
+        # Deleted files and files that can no longer be counted drop out of the totals
+        delete_cached_counts(conn, changed_files)
+        count_pages_by_label([
+            (file_path, file_path) for file_path in changed_files
+            if is_pdf_name(os.path.basename(file_path)) and os.path.isfile(file_path)
+        ], approximate=approximate)
+        
+        return {label: sum_cached_pages(conn, folder_path) for label, folder_path in targets}
+    except sqlite3.Error as e:
+        print(f"Warning: Could not read page cache: {e}")
+        return None
+    finally:
+        conn.close()
 
-def count_pages_by_folder_optimized(root_directory=None):
+def count_pages_by_folder_optimized(root_directory=None, changed_paths=None, config=None):
     """
     Optimized version that counts pages per folder using parallel processing
     Returns: (folder_pages_normal, folder_pages_victoria)
-    If root_directory is not provided, reads from config.json
+    If root_directory is not provided, reads from config (or config.json if not given)
+    If changed_paths is provided and the cache holds a recent full scan, only
+    those files are counted again and folder totals are summed from the cache
     """
+    if config is None:
+        try:
+            config = load_config()
+        except Exception as e:
+            log_message(f"Error reading config.json: {e}. Using default path.")
+    config = config or {}
     if root_directory is None:
-        # Read path from config.json
-        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    root_directory = config.get('monitor', {}).get('watch_path', 'G:/My Drive/XABLAU/')
-            except Exception as e:
-                log_message(f"Error reading config.json: {e}. Using default path.")
-                root_directory = 'G:/My Drive/XABLAU/'
-        else:
-            root_directory = 'G:/My Drive/XABLAU/'
+        root_directory = config.get('monitor', {}).get('watch_path', 'G:/My Drive/XABLAU/')
     
     log_message(f"📂 Pasta raiz configurada para contagem: {root_directory}")
     if not os.path.exists(root_directory):
@@ -97,118 +848,165 @@ def count_pages_by_folder_optimized(root_directory=None):
     folder_pages_victoria = {}
     
     # List all folders in root that start with a digit
-    root_folders = [
-        item for item in os.listdir(root_directory)
-        if os.path.isdir(os.path.join(root_directory, item)) and item[:1].isdigit()
-    ]
+    # scandir entries carry their type, so no extra stat per entry is needed
+    with os.scandir(root_directory) as entries:
+        root_folders = [
+            entry for entry in entries
+            if entry.name[:1].isdigit() and entry.is_dir()
+        ]
     log_message(f"📁 Pastas detectadas para contagem: {len(root_folders)}")
 
-    # Separate normal targets and VICTORIA targets
-    targets_normal = []
-    targets_victoria = []
+    # One list of (label, folder) targets; VICTORIA labels are split out at the end
+    targets = []
+    victoria_labels = set()
 
     for folder in root_folders:
-        folder_path = os.path.join(root_directory, folder)
         # If folder contains VICTORIA, don't add it directly, but rather its subfolders
-        if "VICTORIA" in folder.upper():
-            # Process VICTORIA subfolders separately
+        if VICTORIA_RE.search(folder.name):
             try:
-                victoria_subs = [
-                    sub for sub in os.listdir(folder_path)
-                    if os.path.isdir(os.path.join(folder_path, sub))
-                ]
-                for sub in victoria_subs:
-                    sub_path = os.path.join(folder_path, sub)
-                    label = f"{folder}/{sub}"
-                    targets_victoria.append((label, sub_path))
+                with os.scandir(folder.path) as subs:
+                    for sub in subs:
+                        if sub.is_dir():
+                            label = f"{folder.name}/{sub.name}"
+                            targets.append((label, sub.path))
+                            victoria_labels.add(label)
             except Exception as e:
-                print(f"Error listing subfolders of {folder}: {e}")
+                print(f"Error listing subfolders of {folder.name}: {e}")
         else:
             # Normal folder, add directly
-            targets_normal.append((folder, folder_path))
+            targets.append((folder.name, folder.path))
     
-    # Process normal folders in parallel
-    if targets_normal:
-        with ThreadPoolExecutor(max_workers=min(len(targets_normal), 4)) as executor:
-            future_to_label = {}
-            
-            for label, folder_path in targets_normal:
-                log_message(f"🔎 Iniciando contagem da pasta: {label} ({folder_path})")
-                future = executor.submit(count_pages_in_directory_parallel, folder_path)
-                future_to_label[future] = label
-            
-            # Collect results
-            for future in as_completed(future_to_label):
-                label = future_to_label[future]
-                try:
-                    pages = future.result()
-                    folder_pages_normal[label] = pages
-                    log_message(f"✅ Contagem concluída: {label} -> {pages} páginas")
-                except Exception as e:
-                    log_message(f"Error processing folder {label}: {e}")
-                    folder_pages_normal[label] = 0
-    
-    # Process VICTORIA folders in parallel
-    if targets_victoria:
-        with ThreadPoolExecutor(max_workers=min(len(targets_victoria), 4)) as executor:
-            future_to_label = {}
-            
-            for label, folder_path in targets_victoria:
+    # Opt-in, since the raw scan can be off for unusual PDFs
+    approximate = config.get('pdf', {}).get('approximate_page_scan', False)
+    
+    # Folder moves aren't reported per file, so fall back to a full scan periodically
+    pages_by_label = None
+    if changed_paths is not None:
+        max_age_seconds = config.get('monitor', {}).get('full_rescan_minutes', 60) * 60
+        pages_by_label = count_pages_incrementally(
+            root_directory, changed_paths, targets, max_age_seconds, approximate
+        )
+    
+    if pages_by_label is None:
+        for label, folder_path in targets:
+            if label in victoria_labels:
                 log_message(f"🔎 Iniciando contagem da pasta VICTORIA: {label} ({folder_path})")
-                future = executor.submit(count_pages_in_directory_parallel, folder_path)
-                future_to_label[future] = label
-            
-            # Collect results
-            for future in as_completed(future_to_label):
-                label = future_to_label[future]
-                try:
-                    pages = future.result()
-                    folder_pages_victoria[label] = pages
-                    log_message(f"✅ Contagem VICTORIA concluída: {label} -> {pages} páginas")
-                except Exception as e:
-                    log_message(f"Error processing folder {label}: {e}")
-                    folder_pages_victoria[label] = 0
+            else:
+                log_message(f"🔎 Iniciando contagem da pasta: {label} ({folder_path})")
+        # Walk every target at once and stream the (label, file) tasks into a single
+        # work queue, so slow folders overlap and parsing starts while listing continues
+        seen_paths = set()
+        pages_by_label = count_pages_by_label(iter_pdf_files_by_label(targets), seen_paths, approximate)
+        
+        # The cache now mirrors the tree, so later runs can count incrementally
+        conn = open_page_cache()
+        if conn is not None:
+            try:
+                prune_cached_counts(conn, root_directory, seen_paths)
+                mark_full_scan(conn, root_directory)
+            finally:
+                conn.close()
+    
+    for label, _ in targets:
+        pages = pages_by_label.get(label, 0)
+        if label in victoria_labels:
+            folder_pages_victoria[label] = pages
+            log_message(f"✅ Contagem VICTORIA concluída: {label} -> {pages} páginas")
+        else:
+            folder_pages_normal[label] = pages
+            log_message(f"✅ Contagem concluída: {label} -> {pages} páginas")
     
     return folder_pages_normal, folder_pages_victoria
 
+@functools.lru_cache(maxsize=1024)
 def extract_employee_name(folder_name):
     """
     Extracts employee name from folder name
     Ex: "1.LEIANE" -> "LEIANE"
     """
     # Remove numbers and dots from the beginning
-    name = re.sub(r'^\d+\.?\s*', '', folder_name)
+    name = EMPLOYEE_PREFIX_RE.sub('', folder_name)
     # Remove slashes and subfolders (for VICTORIA folders)
-    name = name.split('/')[0]
+    name = name.split('/', 1)[0]
     return name.strip()
 
+def aggregate_employee_changes(changes_normal, changes_victoria):
+    """
+    Groups the page differences of normal and VICTORIA folders by employee
+    Returns a dict sorted by employee name
+    """
+    employee_changes = defaultdict(int)
+    for changes in (changes_normal, changes_victoria):
+        for folder, change_data in changes.items():
+            employee_changes[extract_employee_name(folder)] += change_data['diff']
+    return dict(sorted(employee_changes.items()))
+
 def get_history_file_path():
     """
     Returns the history file path
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(script_dir, 'pagecount_history.json')
+    return os.path.join(SCRIPT_DIR, 'pagecount_history.json')
 
 def get_lock_file_path():
     """
     Returns the lock file path to prevent concurrent executions
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(script_dir, '.pagecounter.lock')
+    return os.path.join(SCRIPT_DIR, '.pagecounter.lock')
 
 def get_last_message_file_path():
     """
     Returns the path to store the last sent message hash
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(script_dir, '.last_message.json')
+    return os.path.join(SCRIPT_DIR, '.last_message.json')
+
+def get_page_cache_file_path():
+    """
+    Returns the path of the per-file page count cache
+    """
+    return os.path.join(SCRIPT_DIR, 'pagecache.sqlite')
+
+def load_config():
+    """
+    Returns config.json as a dict, parsing it again only when the file changes
+    Returns None if the file does not exist
+    """
+    global CONFIG_CACHE
+    config_path = os.path.join(SCRIPT_DIR, 'config.json')
+    try:
+        stat_result = os.stat(config_path)
+    except FileNotFoundError:
+        return None
+    file_key = (stat_result.st_mtime_ns, stat_result.st_size)
+    if CONFIG_CACHE is None or CONFIG_CACHE[0] != file_key:
+        CONFIG_CACHE = (file_key, read_json_file(config_path))
+    return CONFIG_CACHE[1]
 
 def get_log_file_path():
     """
     Returns the path for the execution log file
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(script_dir, 'pagecounter.log')
+    return os.path.join(SCRIPT_DIR, 'pagecounter.log')
+
+def get_log_file():
+    """
+    Returns the log file handle, opening it on first use
+    It is line buffered, so each message costs one write instead of open/write/close
+    """
+    global LOG_FILE
+    with LOG_FILE_LOCK:
+        if LOG_FILE is None or LOG_FILE.closed:
+            LOG_FILE = open(get_log_file_path(), 'a', encoding='utf-8', buffering=1)
+        return LOG_FILE
+
+def close_log_file():
+    """
+    Closes the log file handle; a later log_message opens it again
+    """
+    global LOG_FILE
+    with LOG_FILE_LOCK:
+        if LOG_FILE is not None:
+            LOG_FILE.close()
+            LOG_FILE = None
 
 def log_message(message):
     """
@@ -218,110 +1016,84 @@ def log_message(message):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         line = f"[{timestamp}] {message}"
         print(message)
-        with open(get_log_file_path(), 'a', encoding='utf-8') as f:
-            f.write(line + "\n")
+        get_log_file().write(line + "\n")
     except Exception as e:
         # Fallback to console only if logging fails
         print(f"Logging failed: {e}")
 
 def acquire_lock():
     """
-    Acquires a lock file to prevent concurrent script executions
+    Acquires an exclusive OS lock on the lock file to prevent concurrent script executions
+    The OS releases the lock when the process exits, so a crashed run never leaves a stale lock
     Returns lock file handle or None if already locked
     """
     lock_path = get_lock_file_path()
     
-    # Check if lock file already exists
-    if os.path.exists(lock_path):
-        try:
-            # Check if the process is still running
-            with open(lock_path, 'r') as f:
-                pid = f.read().strip()
-                # On Windows, we can't easily check if process exists, so we'll just warn
-                # On Unix, we can check if process is still running
-                if HAS_FCNTL:
-                    try:
-                        os.kill(int(pid), 0)  # Check if process exists
-                        print(f"⚠️ Script already running (PID: {pid}). Skipping execution.")
-                        return None
-                    except (OSError, ValueError):
-                        # Process doesn't exist, remove stale lock
-                        os.remove(lock_path)
-                else:
-                    # Windows: check if file is recent (less than 5 minutes old)
-                    file_age = time.time() - os.path.getmtime(lock_path)
-                    if file_age < 300:  # 5 minutes
-                        print(f"⚠️ Script may be running (lock file exists). Skipping execution.")
-                        return None
-                    else:
-                        # Stale lock, remove it
-                        os.remove(lock_path)
-        except:
-            # If we can't read it, try to remove and continue
-            try:
-                os.remove(lock_path)
-            except:
-                pass
+    try:
+        # Open without truncating, so the PID of a running instance stays readable
+        lock_file = os.fdopen(os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644), 'r+')
+    except OSError as e:
+        print(f"⚠️ Could not create lock file: {e}")
+        return None
     
     try:
-        # Create lock file
-        lock_file = open(lock_path, 'w')
-        lock_file.write(str(os.getpid()))
-        lock_file.flush()
-        
-        # On Unix, try to acquire exclusive lock
         if HAS_FCNTL:
-            try:
-                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-            except (IOError, OSError):
-                lock_file.close()
-                print("⚠️ Could not acquire lock. Script may already be running.")
-                return None
-        
-        return lock_file
-    except (IOError, OSError) as e:
-        print(f"⚠️ Could not create lock file: {e}")
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif HAS_MSVCRT:
+            # Locks the first byte; other processes fail immediately instead of waiting
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        print("⚠️ Script already running (lock held by another process). Skipping execution.")
         return None
+    
+    # Record our PID for troubleshooting
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    return lock_file
 
 def release_lock(lock_file):
     """
     Releases the lock file
+    The file itself is kept: deleting it would let a new run lock a fresh file
+    while another process still waits on the old one
     """
     if lock_file:
         try:
+            if HAS_FCNTL:
+                # Pool workers forked during the run inherit this descriptor, so
+                # closing it alone wouldn't drop the flock while they are alive
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            elif HAS_MSVCRT:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
             lock_file.close()
-            lock_path = get_lock_file_path()
-            if os.path.exists(lock_path):
-                os.remove(lock_path)
-        except:
+        except OSError:
             pass
 
 def get_message_hash(message):
     """
     Returns a hash of the message content (excluding timestamp)
     """
-    # Remove timestamp from message for comparison
-    lines = message.split('\n')
-    # Remove lines with timestamp
-    filtered_lines = [line for line in lines if '🕒' not in line and 'Data/Hora' not in line]
-    message_content = '\n'.join(filtered_lines)
-    return hashlib.md5(message_content.encode('utf-8')).hexdigest()
+    # Remove timestamp lines from message for comparison
+    message_content = TIMESTAMP_LINE_RE.sub('', message)
+    # Only used for change detection, so the faster BLAKE2b replaces MD5
+    return hashlib.blake2b(message_content.encode('utf-8'), digest_size=16).hexdigest()
 
-def should_send_message(message, min_cooldown_seconds=None):
+def should_send_message(message, min_cooldown_seconds=None, config=None):
     """
     Checks if message should be sent based on cooldown and content
+    config: already loaded config.json dict, read from disk if not given
     Returns (should_send, reason)
     """
     # Load cooldown from config if not provided
     if min_cooldown_seconds is None:
-        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
         try:
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    min_cooldown_seconds = config.get('message', {}).get('min_cooldown_seconds', 60)
-            else:
-                min_cooldown_seconds = 60
+            if config is None:
+                config = load_config()
+            min_cooldown_seconds = (config or {}).get('message', {}).get('min_cooldown_seconds', 60)
         except:
             min_cooldown_seconds = 60
     last_message_path = get_last_message_file_path()
@@ -330,8 +1102,7 @@ def should_send_message(message, min_cooldown_seconds=None):
         return True, "First message"
     
     try:
-        with open(last_message_path, 'r', encoding='utf-8') as f:
-            last_data = json.load(f)
+        last_data = read_json_file(last_message_path)
         
         last_hash = last_data.get('hash')
         last_timestamp = last_data.get('timestamp')
@@ -357,6 +1128,31 @@ def should_send_message(message, min_cooldown_seconds=None):
         # If we can't read the file, allow sending
         return True, f"Could not check last message: {e}"
 
+def read_json_file(path):
+    """
+    Reads and parses a JSON file with a single read of its raw bytes
+    """
+    with open(path, 'rb') as f:
+        payload = f.read()
+    return orjson.loads(payload) if HAS_ORJSON else json.loads(payload)
+
+def write_json_file(path, data):
+    """
+    Writes data as JSON with a single write to a temporary file, then swaps it
+    into place so readers never see a partially written file, even after a crash
+    """
+    if HAS_ORJSON:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        # Make sure the data is on disk before the rename can replace the old file
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 def save_last_message(message):
     """
     Saves the hash and timestamp of the last sent message
@@ -367,8 +1163,7 @@ def save_last_message(message):
             'hash': get_message_hash(message),
             'timestamp': datetime.now().isoformat()
         }
-        with open(last_message_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        write_json_file(last_message_path, data)
     except Exception as e:
         print(f"Warning: Could not save last message info: {e}")
 
@@ -379,16 +1174,25 @@ def load_previous_results():
     history_path = get_history_file_path()
     if os.path.exists(history_path):
         try:
-            with open(history_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return read_json_file(history_path)
         except Exception as e:
                 print(f"Error loading history: {e}")
     return None
 
-def save_current_results(folder_pages_normal, folder_pages_victoria, total_pages_before_victoria):
+def save_current_results(folder_pages_normal, folder_pages_victoria, total_pages_before_victoria,
+                         previous_data=None):
     """
     Saves current results for future comparison
+    Skips the write when the counts equal previous_data, so unchanged runs don't
+    make Google Drive sync the history file again
     """
+    if previous_data and (
+        previous_data.get('folder_pages_normal') == folder_pages_normal
+        and previous_data.get('folder_pages_victoria') == folder_pages_victoria
+        and previous_data.get('total_pages_before_victoria') == total_pages_before_victoria
+    ):
+        return
+    
     history_path = get_history_file_path()
     try:
         data = {
@@ -397,141 +1201,293 @@ def save_current_results(folder_pages_normal, folder_pages_victoria, total_pages
             'folder_pages_victoria': folder_pages_victoria,
             'total_pages_before_victoria': total_pages_before_victoria
         }
-        with open(history_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        write_json_file(history_path, data)
     except Exception as e:
                 print(f"Error saving history: {e}")
 
-def calculate_changes(current_normal, current_victoria, previous_data):
+def diff_folder_pages(current_pages, previous_pages):
     """
-    Calculates changes by comparing with the last reading
-    Returns: (changes_normal, changes_victoria)
+    Compares two {folder: pages} dicts and returns only the folders whose count changed
     """
-    changes_normal = {}
-    changes_victoria = {}
-    
-    if previous_data is None:
-        return changes_normal, changes_victoria
-    
-    prev_normal = previous_data.get('folder_pages_normal', {})
-    prev_victoria = previous_data.get('folder_pages_victoria', {})
-    
-    # Compare normal folders
-    all_folders = set(current_normal.keys()) | set(prev_normal.keys())
-    for folder in all_folders:
-        current = current_normal.get(folder, 0)
-        previous = prev_normal.get(folder, 0)
-        diff = current - previous
-        if diff != 0:
-            changes_normal[folder] = {
+    changes = {}
+    for folder, current in current_pages.items():
+        previous = previous_pages.get(folder, 0)
+        if current != previous:
+            changes[folder] = {
                 'current': current,
                 'previous': previous,
-                'diff': diff
+                'diff': current - previous
             }
-    
-    # Compare VICTORIA folders
-    all_folders_victoria = set(current_victoria.keys()) | set(prev_victoria.keys())
-    for folder in all_folders_victoria:
-        current = current_victoria.get(folder, 0)
-        previous = prev_victoria.get(folder, 0)
-        diff = current - previous
-        if diff != 0:
-            changes_victoria[folder] = {
-                'current': current,
+    # Folders that disappeared since the last reading
+    for folder in previous_pages.keys() - current_pages.keys():
+        previous = previous_pages[folder]
+        if previous:
+            changes[folder] = {
+                'current': 0,
                 'previous': previous,
-                'diff': diff
+                'diff': -previous
             }
+    return changes
+
+def calculate_changes(current_normal, current_victoria, previous_data):
+    """
+    Calculates changes by comparing with the last reading
+    Returns: (changes_normal, changes_victoria)
+    """
+    if previous_data is None:
+        return {}, {}
     
+    changes_normal = diff_folder_pages(current_normal, previous_data.get('folder_pages_normal', {}))
+    changes_victoria = diff_folder_pages(current_victoria, previous_data.get('folder_pages_victoria', {}))
     return changes_normal, changes_victoria
 
+def render_employee_lines(employee_changes):
+    """
+    Renders one line per employee whose page count changed
+    """
+    lines = []
+    for employee, total_diff in employee_changes.items():
+        if total_diff > 0:
+            lines.append(f"➕ {employee}: +{total_diff} páginas")
+        elif total_diff < 0:
+            lines.append(f"➖ {employee}: {total_diff} páginas")
+    return lines
+
+def render_folder_lines(folder_pages, changes):
+    """
+    Renders one "'folder': N páginas (+diff)" line per folder, sorted by name
+    """
+    lines = []
+    for folder, pages in sorted(folder_pages.items()):
+        change_info = ""
+        change_data = changes.get(folder)
+        if change_data:
+            diff = change_data['diff']
+            if diff > 0:
+                change_info = f" (+{diff})"
+            elif diff < 0:
+                change_info = f" ({diff})"
+        lines.append(f"'{folder}': {pages} páginas{change_info}")
+    return lines
+
+def format_previous_timestamp(previous_timestamp):
+    """
+    Formats the ISO timestamp of the last reading, or returns None if it is missing or invalid
+    """
+    if not previous_timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(previous_timestamp).strftime("%d/%m/%Y %H:%M")
+    except (TypeError, ValueError):
+        return None
+
 def format_whatsapp_message(folder_pages_normal, folder_pages_victoria, total_pages_before_victoria, 
-                            changes_normal, changes_victoria, current_datetime, previous_timestamp=None):
+                            changes_normal, changes_victoria, current_datetime, previous_timestamp=None,
+                            employee_changes=None, employee_lines=None, normal_lines=None,
+                            victoria_lines=None):
     """
     Formats counting results for WhatsApp sending
+    employee_changes: changes already grouped by aggregate_employee_changes (computed if omitted)
+    employee_lines, normal_lines, victoria_lines: lines already rendered for the
+    console report, reused instead of sorting and rendering the folders again
     """
-    message = "📊 *Relatório XABLAU ENTERPRISES*\n\n"
+    # Lines are collected and joined once instead of growing a string with +=
+    parts = ["📊 *Relatório XABLAU ENTERPRISES*\n\n"]
     
     # Total before VICTORIA folders
-    message += f"📈 *Total:* {total_pages_before_victoria} páginas\n\n"
+    parts.append(f"📈 *Total:* {total_pages_before_victoria} páginas\n\n")
     
     # Changes since last reading
     if changes_normal or changes_victoria:
-        message += "📊 *Mudanças desde a última leitura:*\n"
+        parts.append("📊 *Mudanças desde a última leitura:*\n")
         
-        # Group changes by employee
-        employee_changes = {}
+        if employee_lines is None:
+            if employee_changes is None:
+                employee_changes = aggregate_employee_changes(changes_normal, changes_victoria)
+            employee_lines = render_employee_lines(employee_changes)
         
-        # Process normal changes
-        for folder, change_data in changes_normal.items():
-            employee = extract_employee_name(folder)
-            if employee not in employee_changes:
-                employee_changes[employee] = 0
-            employee_changes[employee] += change_data['diff']
+        # Show changes by employee
+        parts.extend(f"{line}\n" for line in employee_lines)
         
-        # Process VICTORIA changes
-        for folder, change_data in changes_victoria.items():
-            employee = extract_employee_name(folder)
-            if employee not in employee_changes:
-                employee_changes[employee] = 0
-            employee_changes[employee] += change_data['diff']
+        prev_str = format_previous_timestamp(previous_timestamp)
+        if prev_str:
+            parts.append(f"\n(Última leitura: {prev_str})\n")
+        parts.append("\n")
+    
+    # Normal folders, then VICTORIA folders (already processed)
+    sections = (
+        ("📁 *Contagem por Pasta:*\n", folder_pages_normal, changes_normal, normal_lines),
+        ("📁 *Pastas VICTORIA (Processadas):*\n", folder_pages_victoria, changes_victoria, victoria_lines),
+    )
+    for title, folder_pages, changes, lines in sections:
+        if not folder_pages:
+            continue
+        if lines is None:
+            lines = render_folder_lines(folder_pages, changes)
+        parts.append(title)
+        parts.extend(f"{line}\n" for line in lines)
+        parts.append("\n")
+    
+    parts.append(f"🕒 *Data/Hora:* {current_datetime}")
+    
+    return "".join(parts)
+
+def read_pipe_lines(pipe, lines):
+    """
+    Pushes every line read from pipe into the lines queue, followed by None at EOF
+    """
+    try:
+        for line in pipe:
+            lines.put(line)
+    except (OSError, ValueError):
+        pass
+    lines.put(None)
+
+def log_pipe_lines(pipe):
+    """
+    Logs every line the WhatsApp daemon writes to stderr
+    """
+    try:
+        for line in pipe:
+            if line.strip():
+                log_message(f"📱 {line.rstrip()}")
+    except (OSError, ValueError):
+        pass
+
+def wait_daemon_response(lines, timeout):
+    """
+    Returns the next JSON status line from the WhatsApp daemon
+    Returns None on timeout or if the daemon exited
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        try:
+            line = lines.get(timeout=remaining)
+        except queue.Empty:
+            return None
+        if line is None:
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            continue
+
+def stop_whatsapp_daemon():
+    """
+    Closes the WhatsApp daemon stdin so it can log out cleanly, killing it if it hangs
+    """
+    global WHATSAPP_DAEMON, WHATSAPP_DAEMON_LINES, WHATSAPP_DAEMON_LOGGER
+    proc = WHATSAPP_DAEMON
+    logger = WHATSAPP_DAEMON_LOGGER
+    WHATSAPP_DAEMON = None
+    WHATSAPP_DAEMON_LINES = None
+    WHATSAPP_DAEMON_LOGGER = None
+    if proc is None:
+        return
+    try:
+        proc.stdin.close()
+        proc.wait(timeout=30)
+    except Exception:
+        proc.kill()
+    # Let the stderr reader log the daemon's last lines; bounded, since a
+    # leftover browser process could keep the pipe open
+    if logger is not None:
+        logger.join(timeout=5)
+
+def shutdown():
+    """
+    Exit hook: stops the WhatsApp daemon first, so its shutdown lines still
+    reach pagecounter.log, and only then closes the log file
+    """
+    stop_whatsapp_daemon()
+    close_log_file()
+
+atexit.register(shutdown)
+
+def start_whatsapp_daemon(node_script, script_dir, ready_timeout, creationflags):
+    """
+    Starts whatsapp-sender.js in daemon mode and waits until WhatsApp is ready
+    Returns True if the daemon is ready to receive messages
+    """
+    global WHATSAPP_DAEMON, WHATSAPP_DAEMON_LINES, WHATSAPP_DAEMON_LOGGER
+    log_message("🚀 Iniciando processo persistente do WhatsApp...")
+    proc = subprocess.Popen(
+        ['node', node_script, '--daemon'],
+        cwd=script_dir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        bufsize=1,
+        creationflags=creationflags
+    )
+    lines = queue.Queue()
+    threading.Thread(target=read_pipe_lines, args=(proc.stdout, lines), daemon=True).start()
+    logger = threading.Thread(target=log_pipe_lines, args=(proc.stderr,), daemon=True)
+    logger.start()
+    WHATSAPP_DAEMON = proc
+    WHATSAPP_DAEMON_LINES = lines
+    WHATSAPP_DAEMON_LOGGER = logger
+    
+    response = wait_daemon_response(lines, ready_timeout)
+    if not response or response.get('status') != 'ready':
+        error = response.get('error') if response else f"sem resposta em {ready_timeout:.0f}s"
+        log_message(f"❌ Processo persistente do WhatsApp não ficou pronto: {error}")
+        stop_whatsapp_daemon()
+        return False
+    return True
+
+def send_via_whatsapp_daemon(node_script, script_dir, message, ready_timeout, send_timeout, creationflags):
+    """
+    Sends message through the long-lived whatsapp-sender.js process, starting it if needed,
+    so Node.js and the WhatsApp Web session are only initialized once per process
+    Returns True/False once the message was handed to the daemon,
+    or None if the daemon is unavailable and nothing was sent
+    """
+    with WHATSAPP_DAEMON_LOCK:
+        try:
+            if WHATSAPP_DAEMON is None or WHATSAPP_DAEMON.poll() is not None:
+                stop_whatsapp_daemon()
+                if not start_whatsapp_daemon(node_script, script_dir, ready_timeout, creationflags):
+                    return None
+            WHATSAPP_DAEMON.stdin.write(json.dumps({'message': message}) + "\n")
+            WHATSAPP_DAEMON.stdin.flush()
+        except OSError as e:
+            log_message(f"⚠️ Falha ao comunicar com o processo persistente do WhatsApp: {e}")
+            stop_whatsapp_daemon()
+            return None
         
-        # Show changes by employee
-        for employee, total_diff in sorted(employee_changes.items()):
-            if total_diff > 0:
-                message += f"➕ {employee}: +{total_diff} páginas\n"
-            elif total_diff < 0:
-                message += f"➖ {employee}: {total_diff} páginas\n"
+        start_time = time.time()
+        response = wait_daemon_response(WHATSAPP_DAEMON_LINES, send_timeout)
+        elapsed_time = time.time() - start_time
+        log_message(f"⏱️ Tempo de envio pelo processo persistente: {elapsed_time:.2f}s")
         
-        if previous_timestamp:
-            try:
-                prev_dt = datetime.fromisoformat(previous_timestamp)
-                prev_str = prev_dt.strftime("%d/%m/%Y %H:%M")
-                message += f"\n(Última leitura: {prev_str})\n"
-            except:
-                pass
-        message += "\n"
-    
-    # Normal folders (if any)
-    if folder_pages_normal:
-        message += "📁 *Contagem por Pasta:*\n"
-        for folder, pages in sorted(folder_pages_normal.items()):
-            change_info = ""
-            if folder in changes_normal:
-                diff = changes_normal[folder]['diff']
-                if diff > 0:
-                    change_info = f" (+{diff})"
-                elif diff < 0:
-                    change_info = f" ({diff})"
-            message += f"'{folder}': {pages} páginas{change_info}\n"
-        message += "\n"
-    
-    # VICTORIA folders (already processed)
-    if folder_pages_victoria:
-        message += "📁 *Pastas VICTORIA (Processadas):*\n"
-        for folder, pages in sorted(folder_pages_victoria.items()):
-            change_info = ""
-            if folder in changes_victoria:
-                diff = changes_victoria[folder]['diff']
-                if diff > 0:
-                    change_info = f" (+{diff})"
-                elif diff < 0:
-                    change_info = f" ({diff})"
-            message += f"'{folder}': {pages} páginas{change_info}\n"
-        message += "\n"
-    
-    message += f"🕒 *Data/Hora:* {current_datetime}"
-    
-    return message
-
-def send_whatsapp_message(message, check_cooldown=True, force=False):
+        if response is None:
+            log_message(f"❌ Sem resposta do processo persistente do WhatsApp após {elapsed_time:.2f}s (limite: {send_timeout:.0f}s)")
+            stop_whatsapp_daemon()
+            return False
+        if response.get('status') == 'ok':
+            if not response.get('ack'):
+                log_message("⚠️ Ack de entrega não recebido dentro do timeout")
+            return True
+        log_message(f"❌ Erro: {response.get('error')}")
+        return False
+
+def send_whatsapp_message(message, check_cooldown=True, force=False, config=None):
     """
     Sends message via WhatsApp using the Node.js script
     check_cooldown: If True, checks cooldown and message content before sending
     force: If True, ignores cooldown and duplicate message checks (for testing)
+    config: already loaded config.json dict, read from disk if not given
     """
     # Check if we should send the message
     if check_cooldown and not force:
-        should_send, reason = should_send_message(message)
+        should_send, reason = should_send_message(message, config=config)
         if not should_send:
             log_message(f"⏭️ Skipping WhatsApp message: {reason}")
             return False
@@ -542,14 +1498,12 @@ def send_whatsapp_message(message, check_cooldown=True, force=False):
     
     try:
         # Read config to check if WhatsApp is enabled
-        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-        if not os.path.exists(config_path):
+        if config is None:
+            config = load_config()
+        if config is None:
             log_message("config.json file not found. Skipping WhatsApp sending.")
             return False
         
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
         if not config.get('whatsapp', {}).get('enabled', False):
             log_message("WhatsApp sending disabled in config.json")
             return False
@@ -566,26 +1520,41 @@ def send_whatsapp_message(message, check_cooldown=True, force=False):
         log_message(f"⏱️ Timeout configurado: {total_timeout:.0f}s (inicialização: 60s + mensagem: {message_timeout_seconds:.0f}s + ACK: 20s + buffer: 30s)")
         
         # Get path to Node.js script
-        script_dir = os.path.dirname(os.path.abspath(__file__))
+        script_dir = SCRIPT_DIR
         node_script = os.path.join(script_dir, 'whatsapp-sender.js')
         
         if not os.path.exists(node_script):
             print(f"whatsapp-sender.js script not found in {script_dir}")
             return False
         
-        # Call Node.js script with message as argument
-        # For Windows compatibility, pass message directly as list item
         log_message("Enviando resultados para WhatsApp...")
         log_message(f"ℹ️ Tamanho da mensagem: {len(message)} caracteres")
         
-        # Pass message as separate argument to avoid shell escaping issues
-        cmd = ['node', node_script, message]
-
         # Evita abrir janela do Node no Windows quando rodando em background
         creationflags = 0
         if os.name == 'nt':
             creationflags = subprocess.CREATE_NO_WINDOW
         
+        # Prefer the long-lived Node process; fall back to one process per message
+        if whatsapp_cfg.get('daemon', True):
+            sent = send_via_whatsapp_daemon(
+                node_script, script_dir, message,
+                ready_timeout=60 + 30,
+                send_timeout=message_timeout_seconds + 20 + 30,
+                creationflags=creationflags
+            )
+            if sent is not None:
+                if sent:
+                    log_message("✅ Message sent successfully to WhatsApp!")
+                    save_last_message(message)
+                return sent
+            log_message("⚠️ Usando envio com processo único do Node.js...")
+        
+        # Call Node.js script with message as argument
+        # For Windows compatibility, pass message directly as list item
+        # Pass message as separate argument to avoid shell escaping issues
+        cmd = ['node', node_script, message]
+        
         start_time = time.time()
         try:
             result = subprocess.run(
@@ -628,18 +1597,12 @@ def send_whatsapp_message(message, check_cooldown=True, force=False):
         log_message(f"❌ Error sending WhatsApp message: {e}")
         return False
 
-def main():
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(
-        description='Count PDF pages in folders and send results via WhatsApp'
-    )
-    parser.add_argument(
-        '--force',
-        action='store_true',
-        help='Force send WhatsApp message even if it\'s a duplicate or cooldown is active (for testing)'
-    )
-    args = parser.parse_args()
-    
+def run_once(force=False, changed_paths=None):
+    """
+    Counts pages, reports changes and sends the WhatsApp message once
+    changed_paths are the files reported by folder-monitor.py since the last run
+    Returns the results dict, or None if another execution holds the lock
+    """
     # Acquire lock to prevent concurrent executions
     lock_file = acquire_lock()
     if not lock_file:
@@ -649,15 +1612,22 @@ def main():
         start_time = time.time()
         
         log_message("Starting page count...")
-        if args.force:
+        if force:
             log_message("🔧 Modo FORCE ativado via linha de comando")
         print("="*50)
         
         # Load previous results for comparison
         previous_data = load_previous_results()
         
+        # Read config.json once and share it with counting and sending
+        try:
+            config = load_config()
+        except Exception as e:
+            log_message(f"Error reading config.json: {e}. Using default settings.")
+            config = {}
+        
         # Optimized folder counting (returns separated: normal and VICTORIA)
-        folder_pages_normal, folder_pages_victoria = count_pages_by_folder_optimized()
+        folder_pages_normal, folder_pages_victoria = count_pages_by_folder_optimized(changed_paths=changed_paths, config=config)
         
         # Calculate total before VICTORIA folders (sum of normal folders)
         total_pages_before_victoria = sum(folder_pages_normal.values())
@@ -666,9 +1636,14 @@ def main():
         changes_normal, changes_victoria = calculate_changes(
             folder_pages_normal, folder_pages_victoria, previous_data
         )
+        # Grouped, sorted and rendered once, then shared by the console report and the WhatsApp message
+        employee_changes = aggregate_employee_changes(changes_normal, changes_victoria)
+        employee_lines = render_employee_lines(employee_changes)
+        normal_lines = render_folder_lines(folder_pages_normal, changes_normal)
+        victoria_lines = render_folder_lines(folder_pages_victoria, changes_victoria)
         
         # Save current results for next comparison
-        save_current_results(folder_pages_normal, folder_pages_victoria, total_pages_before_victoria)
+        save_current_results(folder_pages_normal, folder_pages_victoria, total_pages_before_victoria, previous_data)
         
         # Show total before VICTORIA folders
         print(f"\n📈 *Total:* {total_pages_before_victoria} páginas")
@@ -678,37 +1653,13 @@ def main():
         if changes_normal or changes_victoria:
             print("\n📊 *Mudanças desde a última leitura:*")
             
-            # Group changes by employee
-            employee_changes = {}
-            
-            # Process normal changes
-            for folder, change_data in changes_normal.items():
-                employee = extract_employee_name(folder)
-                if employee not in employee_changes:
-                    employee_changes[employee] = 0
-                employee_changes[employee] += change_data['diff']
-            
-            # Process VICTORIA changes
-            for folder, change_data in changes_victoria.items():
-                employee = extract_employee_name(folder)
-                if employee not in employee_changes:
-                    employee_changes[employee] = 0
-                employee_changes[employee] += change_data['diff']
-            
             # Show changes by employee
-            for employee, total_diff in sorted(employee_changes.items()):
-                if total_diff > 0:
-                    print(f"➕ {employee}: +{total_diff} páginas")
-                elif total_diff < 0:
-                    print(f"➖ {employee}: {total_diff} páginas")
+            if employee_lines:
+                print("\n".join(employee_lines))
             
-            if previous_data and 'timestamp' in previous_data:
-                try:
-                    prev_dt = datetime.fromisoformat(previous_data['timestamp'])
-                    prev_str = prev_dt.strftime("%d/%m/%Y %H:%M")
-                    print(f"(Última leitura: {prev_str})")
-                except:
-                    pass
+            prev_str = format_previous_timestamp(previous_data.get('timestamp') if previous_data else None)
+            if prev_str:
+                print(f"(Última leitura: {prev_str})")
         else:
             if previous_data:
                 print("\n📊 Nenhuma mudança desde a última leitura.")
@@ -718,28 +1669,12 @@ def main():
         # Show normal folders
         if folder_pages_normal:
             print("\n📁 *Contagem por Pasta:*")
-            for folder, pages in sorted(folder_pages_normal.items()):
-                change_info = ""
-                if folder in changes_normal:
-                    diff = changes_normal[folder]['diff']
-                    if diff > 0:
-                        change_info = f" (+{diff})"
-                    elif diff < 0:
-                        change_info = f" ({diff})"
-                print(f"Pasta '{folder}': {pages} páginas{change_info}")
+            print("\n".join(f"Pasta {line}" for line in normal_lines))
         
         # Show VICTORIA folders (already processed)
         if folder_pages_victoria:
             print("\n📁 *Pastas VICTORIA (Processadas):*")
-            for folder, pages in sorted(folder_pages_victoria.items()):
-                change_info = ""
-                if folder in changes_victoria:
-                    diff = changes_victoria[folder]['diff']
-                    if diff > 0:
-                        change_info = f" (+{diff})"
-                    elif diff < 0:
-                        change_info = f" ({diff})"
-                print(f"Pasta '{folder}': {pages} páginas{change_info}")
+            print("\n".join(f"Pasta {line}" for line in victoria_lines))
         
         if not folder_pages_normal and not folder_pages_victoria:
             print("No folders found in root.")
@@ -750,21 +1685,44 @@ def main():
         # Send results to WhatsApp only if there are changes or it's the first run
         if folder_pages_normal or folder_pages_victoria:
             # Only send if there are actual changes, it's the first execution, or force flag is set
-            if changes_normal or changes_victoria or not previous_data or args.force:
+            if changes_normal or changes_victoria or not previous_data or force:
                 current_datetime = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
                 previous_timestamp = previous_data.get('timestamp') if previous_data else None
                 message = format_whatsapp_message(
                     folder_pages_normal, folder_pages_victoria, total_pages_before_victoria,
-                    changes_normal, changes_victoria, current_datetime, previous_timestamp
+                    changes_normal, changes_victoria, current_datetime, previous_timestamp,
+                    employee_changes, employee_lines, normal_lines, victoria_lines
                 )
-                send_whatsapp_message(message, force=args.force)
+                send_whatsapp_message(message, force=force, config=config)
             else:
                 print("\n⏭️ No changes detected. Skipping WhatsApp message.")
-                if args.force:
+                if force:
                     print("💡 Dica: Use --force para enviar mesmo sem mudanças")
+        
+        return {
+            'folder_pages_normal': folder_pages_normal,
+            'folder_pages_victoria': folder_pages_victoria,
+            'total_pages_before_victoria': total_pages_before_victoria
+        }
     finally:
         # Always release lock
         release_lock(lock_file)
 
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        description='Count PDF pages in folders and send results via WhatsApp'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Force send WhatsApp message even if it\'s a duplicate or cooldown is active (for testing)'
+    )
+    args = parser.parse_args()
+    
+    # Exit non-zero when the run was skipped, so folder-monitor.py --subprocess retries it
+    if run_once(force=args.force) is None:
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,6 +2,7 @@ const { Client, LocalAuth } = require("whatsapp-web.js");
 const qrcode = require("qrcode-terminal");
 const fs = require("fs");
 const path = require("path");
+const readline = require("readline");
 
 // Read configuration
 const configPath = path.join(__dirname, "config.json");
@@ -13,14 +14,36 @@ try {
   process.exit(1);
 }
 
+// --daemon keeps the client running and reads one JSON request per line
+// ({"message": "..."}) from stdin, answering with one JSON line on stdout
+const args = process.argv.slice(2);
+const daemonMode = args.includes("--daemon");
+
 // Get message from command line argument
 // Join all arguments after script name to handle messages with special characters
-const message = process.argv.slice(2).join(" ");
-if (!message) {
+const message = args.filter((arg) => arg !== "--daemon").join(" ");
+if (!message && !daemonMode) {
   console.error("Error: Message not provided");
   process.exit(1);
 }
 
+// In daemon mode stdout is reserved for responses, so logs go to stderr
+if (daemonMode) {
+  console.log = (...logArgs) => console.error(...logArgs);
+}
+
+function respond(payload) {
+  process.stdout.write(JSON.stringify(payload) + "\n");
+}
+
+function isSendSeenError(errorMsg) {
+  return (
+    errorMsg.includes("markedUnread") ||
+    errorMsg.includes("sendSeen") ||
+    errorMsg.includes("Cannot read properties of undefined")
+  );
+}
+
 // Check if WhatsApp is enabled
 if (!config.whatsapp.enabled) {
   console.log("WhatsApp sending disabled in config.json");
@@ -76,111 +99,194 @@ async function waitForAck(messageId, timeoutMs = 20000) {
   });
 }
 
-// Ready event
-client.on("ready", async () => {
-  const initElapsed = Date.now() - initStartTime;
-  console.log(`✅ WhatsApp connected! (inicialização levou ${initElapsed}ms)`);
-  const readyStartTime = Date.now();
+// Finds the chat id of the configured group or contact
+async function resolveChatId() {
+  const target = config.whatsapp.target;
+  const type = config.whatsapp.type;
+
+  console.log(`Looking for ${type}: ${target}`);
+  let chatId;
+
+  if (type === "group") {
+    // Search for group by name or use ID directly
+    const chats = await client.getChats();
+    const group = chats.find(
+      (chat) =>
+        chat.isGroup &&
+        (chat.name.toLowerCase() === target.toLowerCase() ||
+          chat.id._serialized === target ||
+          chat.id._serialized === target + "@g.us"),
+    );
 
-  try {
-    const target = config.whatsapp.target;
-    const type = config.whatsapp.type;
-
-    console.log(`Looking for ${type}: ${target}`);
-    let chatId;
-
-    if (type === "group") {
-      // Search for group by name or use ID directly
-      const chats = await client.getChats();
-      const group = chats.find(
-        (chat) =>
-          chat.isGroup &&
-          (chat.name.toLowerCase() === target.toLowerCase() ||
-            chat.id._serialized === target ||
-            chat.id._serialized === target + "@g.us"),
+    if (!group) {
+      console.error(`Group "${target}" not found.`);
+      console.log("Available groups:");
+      const groups = chats.filter((chat) => chat.isGroup);
+      groups.forEach((g) =>
+        console.log(`  - ${g.name} (${g.id._serialized})`),
       );
+      throw new Error(`Group "${target}" not found`);
+    }
 
-      if (!group) {
-        console.error(`Group "${target}" not found.`);
-        console.log("Available groups:");
-        const groups = chats.filter((chat) => chat.isGroup);
-        groups.forEach((g) =>
-          console.log(`  - ${g.name} (${g.id._serialized})`),
-        );
-        await client.destroy().catch(() => {});
-        process.exit(1);
-      }
-
-      chatId = group.id._serialized;
-      console.log(`Sending message to group: ${group.name} (id: ${chatId})`);
+    chatId = group.id._serialized;
+    console.log(`Sending message to group: ${group.name} (id: ${chatId})`);
+  } else {
+    // Send to individual contact
+    // Format: 5511999999999@c.us (country code + number + @c.us)
+    if (target.includes("@")) {
+      chatId = target;
     } else {
-      // Send to individual contact
-      // Format: 5511999999999@c.us (country code + number + @c.us)
-      if (target.includes("@")) {
-        chatId = target;
-      } else {
-        // Remove any non-digit characters and add @c.us
-        const number = target.replace(/\D/g, "");
-        chatId = number + "@c.us";
-      }
-      console.log(`Sending message to: ${chatId}`);
+      // Remove any non-digit characters and add @c.us
+      const number = target.replace(/\D/g, "");
+      chatId = number + "@c.us";
     }
+    console.log(`Sending message to: ${chatId}`);
+  }
 
-    // Send message with sendSeen disabled to avoid markedUnread errors
-    console.log(`Sending message (${message.length} characters)...`);
-    const sendStartTime = Date.now();
-    let sent;
-    try {
-      sent = await client.sendMessage(chatId, message, { sendSeen: false });
-      const sendElapsed = Date.now() - sendStartTime;
-      messageWasSent = true;
+  return chatId;
+}
+
+// Sends text to chatId and waits for the delivery ACK
+async function sendText(chatId, text) {
+  // Send message with sendSeen disabled to avoid markedUnread errors
+  console.log(`Sending message (${text.length} characters)...`);
+  const sendStartTime = Date.now();
+  let sent;
+  try {
+    sent = await client.sendMessage(chatId, text, { sendSeen: false });
+    const sendElapsed = Date.now() - sendStartTime;
+    messageWasSent = true;
+    console.log(
+      `Message sent successfully! msgId: ${sent.id._serialized} chatId: ${chatId} (took ${sendElapsed}ms)`,
+    );
+  } catch (sendError) {
+    // If sendSeen: false didn't work, try one more time with error handling
+    const errorMsg = sendError.message || sendError.toString();
+
+    if (isSendSeenError(errorMsg)) {
       console.log(
-        `Message sent successfully! msgId: ${sent.id._serialized} chatId: ${chatId} (took ${sendElapsed}ms)`,
+        "⚠️ Warning: Error related to sendSeen detected. Retrying without sendSeen...",
       );
-    } catch (sendError) {
-      // If sendSeen: false didn't work, try one more time with error handling
-      const errorMsg = sendError.message || sendError.toString();
-      const isMarkedUnreadError =
-        errorMsg.includes("markedUnread") ||
-        errorMsg.includes("sendSeen") ||
-        errorMsg.includes("Cannot read properties of undefined");
-
-      if (isMarkedUnreadError) {
+      try {
+        // Retry without sendSeen (already disabled, but try again)
+        sent = await client.sendMessage(chatId, text, { sendSeen: false });
+        messageWasSent = true;
         console.log(
-          "⚠️ Warning: Error related to sendSeen detected. Retrying without sendSeen...",
+          `Message sent successfully on retry! msgId: ${sent.id._serialized} chatId: ${chatId}`,
+        );
+      } catch (retryError) {
+        console.error(
+          "Error sending message even on retry:",
+          retryError.message,
         );
-        try {
-          // Retry without sendSeen (already disabled, but try again)
-          sent = await client.sendMessage(chatId, message, { sendSeen: false });
-          messageWasSent = true;
-          console.log(
-            `Message sent successfully on retry! msgId: ${sent.id._serialized} chatId: ${chatId}`,
-          );
-        } catch (retryError) {
-          console.error(
-            "Error sending message even on retry:",
-            retryError.message,
-          );
-          throw retryError;
-        }
-      } else {
-        // Real error, re-throw
-        throw sendError;
+        throw retryError;
       }
+    } else {
+      // Real error, re-throw
+      throw sendError;
     }
+  }
 
-    // Aguarda ACK de entrega/servidor (ack >= 1) ou timeout
-    if (sent && sent.id && sent.id._serialized) {
-      console.log("Waiting for delivery ACK...");
-      const ackStartTime = Date.now();
-      const ackReceived = await waitForAck(sent.id._serialized);
-      const ackElapsed = Date.now() - ackStartTime;
-      console.log(
-        ackReceived
-          ? `Ack de entrega recebido (pelo menos chegou ao servidor). (took ${ackElapsed}ms)`
-          : `Ack não recebido dentro do timeout; pode ter falhado. (waited ${ackElapsed}ms)`,
-      );
+  // Aguarda ACK de entrega/servidor (ack >= 1) ou timeout
+  let ackReceived = false;
+  if (sent && sent.id && sent.id._serialized) {
+    console.log("Waiting for delivery ACK...");
+    const ackStartTime = Date.now();
+    ackReceived = await waitForAck(sent.id._serialized);
+    const ackElapsed = Date.now() - ackStartTime;
+    console.log(
+      ackReceived
+        ? `Ack de entrega recebido (pelo menos chegou ao servidor). (took ${ackElapsed}ms)`
+        : `Ack não recebido dentro do timeout; pode ter falhado. (waited ${ackElapsed}ms)`,
+    );
+  }
+  return ackReceived;
+}
+
+// Handles one stdin request in daemon mode
+async function handleDaemonRequest(chatId, line) {
+  let text;
+  try {
+    text = JSON.parse(line).message;
+  } catch (error) {
+    respond({ status: "error", error: `Invalid request: ${error.message}` });
+    return;
+  }
+  if (!text) {
+    respond({ status: "error", error: "Message not provided" });
+    return;
+  }
+
+  messageWasSent = false;
+  messageAcked = false;
+  try {
+    const ack = await sendText(chatId, text);
+    respond({ status: "ok", ack });
+  } catch (error) {
+    const errorMsg = error.message || error.toString();
+    if (messageWasSent && isSendSeenError(errorMsg)) {
+      respond({ status: "ok", ack: messageAcked });
+    } else {
+      console.error("Error sending message:", errorMsg);
+      respond({ status: "error", error: errorMsg });
+    }
+  }
+}
+
+// whatsapp-web.js emits "ready" again after a reconnect, but the stdin loop
+// and the ready line must only happen once per process
+let daemonStarted = false;
+
+// Keeps the client open and sends every message received on stdin
+async function runDaemon() {
+  let chatId;
+  try {
+    chatId = await resolveChatId();
+  } catch (error) {
+    respond({ status: "error", error: error.message });
+    await client.destroy().catch(() => {});
+    process.exit(1);
+  }
+
+  respond({ status: "ready" });
+
+  // Requests are handled one at a time, in arrival order
+  let pending = Promise.resolve();
+  const input = readline.createInterface({ input: process.stdin });
+  input.on("line", (line) => {
+    if (line.trim()) {
+      pending = pending.then(() => handleDaemonRequest(chatId, line));
+    }
+  });
+  input.on("close", () => {
+    pending.then(async () => {
+      console.log("stdin fechado, encerrando cliente WhatsApp...");
+      await client.destroy().catch(() => {});
+      process.exit(0);
+    });
+  });
+}
+
+// Ready event
+client.on("ready", async () => {
+  const initElapsed = Date.now() - initStartTime;
+  console.log(`✅ WhatsApp connected! (inicialização levou ${initElapsed}ms)`);
+
+  if (daemonMode) {
+    if (daemonStarted) {
+      console.log("🔄 WhatsApp reconectado; processo persistente já em execução");
+      return;
     }
+    daemonStarted = true;
+    await runDaemon();
+    return;
+  }
+
+  const readyStartTime = Date.now();
+
+  try {
+    const chatId = await resolveChatId();
+    await sendText(chatId, message);
 
     const totalElapsed = Date.now() - readyStartTime;
     console.log(`Total WhatsApp operation time: ${totalElapsed}ms`);
@@ -194,13 +300,9 @@ client.on("ready", async () => {
   } catch (error) {
     // Check if error is related to sendSeen/markedUnread (non-critical)
     const errorMsg = error.message || error.toString();
-    const isMarkedUnreadError =
-      errorMsg.includes("markedUnread") ||
-      errorMsg.includes("sendSeen") ||
-      errorMsg.includes("Cannot read properties of undefined");
 
     // If message was sent successfully but error is about sendSeen, consider it success
-    if (messageWasSent && isMarkedUnreadError) {
+    if (messageWasSent && isSendSeenError(errorMsg)) {
       console.log(
         "⚠️ Warning: Error marking message as read, but message was sent successfully.",
       );
@@ -265,15 +367,14 @@ process.on("unhandledRejection", (err) => {
     (err && err.message) || (err && err.toString()) || "Unknown rejection";
 
   // Ignore markedUnread/sendSeen errors if message was sent successfully
-  const isMarkedUnreadError =
-    msg.includes("markedUnread") ||
-    msg.includes("sendSeen") ||
-    msg.includes("Cannot read properties of undefined");
-
-  if (isMarkedUnreadError && (messageWasSent || messageAcked)) {
+  if (isSendSeenError(msg) && (messageWasSent || messageAcked)) {
     console.log(
       "⚠️ Warning: Unhandled rejection related to sendSeen (ignored - message was sent)",
     );
+    // The daemon keeps serving further messages
+    if (daemonMode) {
+      return;
+    }
     process.exit(0);
     return;
   }